@@ -0,0 +1,45 @@
+# Numeric core of the simulation. It lives outside web_app.py because Streamlit
+# re-executes the script on every rerun; as an imported module the compiled
+# dispatcher stays in sys.modules instead of being rebuilt each time.
+import math
+
+from numba import njit
+
+@njit(cache=True)
+def sim_kernel(price, marketing, cap, fixed_cost, vibe_score, cat_cost, quality_score,
+               staff_ratio, staff_costper, ratio_score, demand_mult, sat_pen):
+    # 1. Demand
+    # Base Model: 2000 - 3.5*Price + 0.04*Marketing + 10*sqrt(Marketing)
+    base_demand = max(0.0, 2000 - 3.5 * price + 0.04 * marketing + 10 * math.sqrt(marketing))
+    
+    # Risk adjustment
+    risk_demand = base_demand * demand_mult
+    
+    # Capacity constraint
+    attendance = int(min(risk_demand, cap))
+    
+    # 2. Financials
+    revenue = attendance * price
+    
+    catering_cost = attendance * cat_cost
+    
+    num_staff = math.ceil((attendance / 100) * staff_ratio)
+    staff_cost = num_staff * staff_costper
+    
+    total_cost = fixed_cost + marketing + catering_cost + staff_cost
+    profit = revenue - total_cost
+    
+    # 3. Satisfaction
+    crowding = attendance / cap if cap > 0 else 0.0
+    crowding_penalty = 15.0 * (crowding > 0.9)
+    
+    sat_score = vibe_score + quality_score + ratio_score
+    sat_score -= crowding_penalty
+    sat_score += sat_pen
+    sat_score = min(100.0, max(0.0, sat_score))
+    
+    # 4. Final Score
+    # Scaling: Target Profit 200k = 50 pts
+    score = (max(0, profit) / 200000 * 50) + (sat_score * 0.5)
+    
+    return attendance, revenue, catering_cost, staff_cost, total_cost, profit, sat_score, score, crowding
@@ -4,33 +4,26 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import io
+import concurrent.futures
 from datetime import datetime
 
+from sim_core import sim_kernel
+
 # --- CONFIGURATION & STYLING ---
 st.set_page_config(page_title="Best Manager Simulation", layout="wide", page_icon="📊")
 
 # Custom CSS for "Premium" feel
-st.markdown("""
-<style>
-    .main {
-        background-color: #f5f5f5;
-    }
-    .stButton>button {
-        width: 100%;
-        background-color: #4CAF50;
-        color: white;
-        height: 3em;
-        font-weight: bold;
-    }
-    .metric-card {
-        background-color: white;
-        padding: 20px;
-        border-radius: 10px;
-        box-shadow: 2px 2px 10px rgba(0,0,0,0.1);
-        text-align: center;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Kept on one line to trim the payload; it is still sent on every rerun, since
+# Streamlit drops elements a rerun does not re-emit (the styles would vanish)
+CSS = (
+    "<style>"
+    ".main{background-color:#f5f5f5}"
+    ".stButton>button{width:100%;background-color:#4CAF50;color:white;height:3em;font-weight:bold}"
+    ".metric-card{background-color:white;padding:20px;border-radius:10px;"
+    "box-shadow:2px 2px 10px rgba(0,0,0,0.1);text-align:center}"
+    "</style>"
+)
+st.markdown(CSS, unsafe_allow_html=True)
 
 # --- DATA CONSTANTS ---
 VENUES = {
@@ -59,53 +52,105 @@ RISKS = {
     'Viral Buzz': {'DemandMult': 1.5, 'SatPenalty': 5}
 }
 
+# Column-wise (struct-of-arrays) views of the tables above, indexed via the
+# *_IDX maps; these are what the simulation kernels read from. The *_SCORE
+# columns fold in the constant satisfaction weights once
+_VENUE_IDX = {name: i for i, name in enumerate(VENUES)}
+_VENUE_CAP = np.array([v['Capacity'] for v in VENUES.values()])
+_VENUE_FIXED = np.array([v['Fixed Cost'] for v in VENUES.values()])
+_VENUE_VIBE_SCORE = np.array([v['Vibe'] * 3.3 for v in VENUES.values()])
+
+_CATERING_IDX = {name: i for i, name in enumerate(CATERING)}
+_CATERING_COST = np.array([c['Cost'] for c in CATERING.values()])
+_CATERING_QUALITY_SCORE = np.array([c['Quality'] * 3.3 for c in CATERING.values()])
+
+_STAFFING_IDX = {name: i for i, name in enumerate(STAFFING)}
+_STAFFING_RATIO = np.array([s['Ratio'] for s in STAFFING.values()])
+_STAFFING_COSTPER = np.array([s['CostPer'] for s in STAFFING.values()])
+_STAFFING_RATIO_SCORE = np.array([s['Ratio'] * 8 for s in STAFFING.values()])
+
+_RISK_IDX = {name: i for i, name in enumerate(RISKS)}
+_RISK_DEMAND_MULT = np.array([r['DemandMult'] for r in RISKS.values()])
+_RISK_SAT_PENALTY = np.array([r['SatPenalty'] for r in RISKS.values()])
+
 # --- HELPER FUNCTIONS ---
+def _lookup(venue_name, catering_name, staffing_name, risk_name):
+    # All per-choice constants as one flat tuple; callers unpack it by name
+    v = _VENUE_IDX[venue_name]
+    c = _CATERING_IDX[catering_name]
+    s = _STAFFING_IDX[staffing_name]
+    r = _RISK_IDX[risk_name]
+    return (_VENUE_CAP[v], _VENUE_FIXED[v], _VENUE_VIBE_SCORE[v],
+            _CATERING_COST[c], _CATERING_QUALITY_SCORE[c],
+            _STAFFING_RATIO[s], _STAFFING_COSTPER[s], _STAFFING_RATIO_SCORE[s],
+            _RISK_DEMAND_MULT[r], _RISK_SAT_PENALTY[r])
+
 def run_simulation(inputs):
+    # Scalar args keep the cache key cheap to hash
+    return _simulate(inputs['Venue'], inputs['Catering'], inputs['Staffing'],
+                     inputs['Price'], inputs['Marketing'], inputs['Risk'])
+
+@st.cache_data(max_entries=256)
+def _simulate(venue_name, catering_name, staffing_name, price, marketing, risk_name):
     # Unpack
-    venue = VENUES[inputs['Venue']]
-    cat = CATERING[inputs['Catering']]
-    staff = STAFFING[inputs['Staffing']]
-    risk = RISKS[inputs['Risk']]
-    
-    price = inputs['Price']
-    marketing = inputs['Marketing']
-    
-    # 1. Demand
-    # Base Model: 2000 - 3.5*Price + 0.04*Marketing + 10*sqrt(Marketing)
-    base_demand = max(0, 2000 - 3.5 * price + 0.04 * marketing + 10 * np.sqrt(marketing))
+    (cap, fixed_cost, vibe_score, cat_cost, quality_score,
+     staff_ratio, staff_costper, ratio_score, demand_mult, sat_pen) = _lookup(venue_name, catering_name, staffing_name, risk_name)
     
-    # Risk adjustment
-    risk_demand = base_demand * risk['DemandMult']
+    venue_cost = fixed_cost.item()
+    marketing_cost = marketing
     
-    # Capacity constraint
-    attendance = min(risk_demand, venue['Capacity'])
-    attendance = int(attendance)
+    (attendance, revenue, catering_cost, staff_cost, total_cost,
+     profit, sat_score, score, crowding) = sim_kernel(
+        price=price, marketing=marketing, cap=cap, fixed_cost=fixed_cost,
+        vibe_score=vibe_score, cat_cost=cat_cost, quality_score=quality_score,
+        staff_ratio=staff_ratio, staff_costper=staff_costper, ratio_score=ratio_score,
+        demand_mult=demand_mult, sat_pen=sat_pen)
     
-    # 2. Financials
-    revenue = attendance * price
+    return {
+        'Attendance': attendance,
+        'Revenue': revenue,
+        'Total Cost': total_cost,
+        'Profit': profit,
+        'Satisfaction': sat_score,
+        'Score': score,
+        'Crowding': crowding * 100,
+        'Details': {
+            'Venue Cost': venue_cost,
+            'Marketing Cost': marketing_cost,
+            'Catering Cost': catering_cost,
+            'Staff Cost': staff_cost
+        }
+    }
+
+def run_simulation_grid(prices, marketings, venue_name, catering_name, staffing_name, risk_name):
+    # Vectorized run_simulation over every (marketing, price) pair:
+    # rows follow `marketings`, columns follow `prices`
+    (cap, fixed_cost, vibe_score, cat_cost, quality_score,
+     staff_ratio, staff_costper, ratio_score, demand_mult, sat_pen) = _lookup(venue_name, catering_name, staffing_name, risk_name)
     
-    venue_cost = venue['Fixed Cost']
-    marketing_cost = marketing
-    catering_cost = attendance * cat['Cost']
+    P = np.asarray(prices)[np.newaxis, :]
+    M = np.asarray(marketings)[:, np.newaxis]
     
-    num_staff = np.ceil((attendance / 100) * staff['Ratio'])
-    staff_cost = num_staff * staff['CostPer']
+    # 1. Demand
+    base_demand = np.maximum(0, 2000 - 3.5 * P + 0.04 * M + 10 * np.sqrt(M))
+    attendance = np.minimum(base_demand * demand_mult, cap).astype(np.int32)
     
-    total_cost = venue_cost + marketing_cost + catering_cost + staff_cost
+    # 2. Financials
+    revenue = attendance * P
+    catering_cost = attendance * cat_cost
+    staff_cost = np.ceil((attendance / 100) * staff_ratio) * staff_costper
+    total_cost = fixed_cost + M + catering_cost + staff_cost
     profit = revenue - total_cost
     
     # 3. Satisfaction
-    crowding = attendance / venue['Capacity'] if venue['Capacity'] > 0 else 0
-    crowding_penalty = 15 if crowding > 0.9 else 0
+    crowding = attendance / cap
+    crowding_penalty = 15.0 * (crowding > 0.9)
     
-    sat_score = (venue['Vibe'] * 3.3) + (cat['Quality'] * 3.3) + (staff['Ratio'] * 8)
-    sat_score -= crowding_penalty
-    sat_score += risk['SatPenalty']
-    sat_score = min(100, max(0, sat_score))
+    sat_score = vibe_score + quality_score + ratio_score
+    sat_score = np.clip(sat_score - crowding_penalty + sat_pen, 0, 100)
     
     # 4. Final Score
-    # Scaling: Target Profit 200k = 50 pts
-    score = (max(0, profit) / 200000 * 50) + (sat_score * 0.5)
+    score = (np.maximum(0, profit) / 200000 * 50) + (sat_score * 0.5)
     
     return {
         'Attendance': attendance,
@@ -114,53 +159,115 @@ def run_simulation(inputs):
         'Profit': profit,
         'Satisfaction': sat_score,
         'Score': score,
-        'Crowding': crowding * 100,
-        'Details': {
-            'Venue Cost': venue_cost,
-            'Marketing Cost': marketing_cost,
-            'Catering Cost': catering_cost,
-            'Staff Cost': staff_cost
-        }
+        'Crowding': crowding * 100
     }
 
 def generate_excel_download(inputs, results, team_name):
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'in_memory': True}}) as writer:
         # Sheet 1: Summary
-        summary_data = {
-            'Metric': ['Team Name', 'Success Score', 'Net Profit', 'Satisfaction', 'Attendance', 'Total Revenue', 'Total Cost'],
-            'Value': [team_name, results['Score'], results['Profit'], results['Satisfaction'], results['Attendance'], results['Revenue'], results['Total Cost']]
-        }
-        pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
+        metrics = ['Team Name', 'Success Score', 'Net Profit', 'Satisfaction', 'Attendance', 'Total Revenue', 'Total Cost']
+        values = [team_name, results['Score'], results['Profit'], results['Satisfaction'], results['Attendance'], results['Revenue'], results['Total Cost']]
+        pd.DataFrame(zip(metrics, values), columns=['Metric', 'Value']).to_excel(writer, sheet_name='Summary', index=False, merge_cells=False)
         
         # Sheet 2: Decisions
-        decision_data = {'Decision Variable': list(inputs.keys()), 'Selected Option': list(inputs.values())}
-        pd.DataFrame(decision_data).to_excel(writer, sheet_name='Decisions', index=False)
+        pd.DataFrame(inputs.items(), columns=['Decision Variable', 'Selected Option']).to_excel(writer, sheet_name='Decisions', index=False, merge_cells=False)
         
         # Sheet 3: Cost Breakdown
-        cost_data = {'Category': list(results['Details'].keys()), 'Amount': list(results['Details'].values())}
-        pd.DataFrame(cost_data).to_excel(writer, sheet_name='Cost Breakdown', index=False)
+        pd.DataFrame(results['Details'].items(), columns=['Category', 'Amount']).to_excel(writer, sheet_name='Cost Breakdown', index=False, merge_cells=False)
         
     return output.getvalue()
 
+# Static trace properties shared by every waterfall / gauge figure
+WATERFALL_STYLE = dict(
+    name = "Finance", orientation = "v",
+    measure = ["relative", "relative", "relative", "relative", "relative", "total"],
+    textposition = "outside",
+    connector = {"line":{"color":"rgb(63, 63, 63)"}},
+)
+
+GAUGE_STYLE = dict(
+    mode = "gauge+number",
+    title = {'text': "Customer Satisfaction"},
+    gauge = {'axis': {'range': [None, 100]}, 'bar': {'color': "darkblue"}}
+)
+
+@st.cache_resource(ttl=3600, max_entries=256)
+def make_waterfall(revenue, venue_c, mkt_c, cat_c, staff_c, profit):
+    categories = ['Revenue', 'Venue', 'Marketing', 'Catering', 'Staffing', 'NET PROFIT']
+    amounts = [revenue, -venue_c, -mkt_c, -cat_c, -staff_c, profit]
+    return go.Figure(go.Waterfall(
+        **WATERFALL_STYLE,
+        x = categories,
+        text = [a/1000 for a in amounts],
+        y = amounts,
+    ), layout = {'width': 600, 'height': 400})
+
+@st.cache_resource(ttl=3600, max_entries=256)
+def make_gauge(sat):
+    # Narrower than the other charts: it sits in the 1/3-width column
+    return go.Figure(go.Indicator(**GAUGE_STYLE, value = sat),
+                     layout = {'width': 300, 'height': 400})
+
+@st.cache_resource(ttl=3600, max_entries=64)
+def make_strategy_map(venue_name, catering_name, staffing_name, risk_name):
+    # Same ranges as the sidebar's price slider and marketing input
+    prices = np.arange(50, 501, 10)
+    marketings = np.arange(0, 100001, 1000)
+    grid = run_simulation_grid(prices, marketings, venue_name, catering_name, staffing_name, risk_name)
+    return px.imshow(
+        grid['Score'], x=prices, y=marketings, origin='lower', aspect='auto',
+        color_continuous_scale='Viridis',
+        labels={'x': 'Ticket Price ($)', 'y': 'Marketing Budget ($)', 'color': 'Score'},
+        title="Optimal Strategy Map (Success Score)", height=500
+    )
+
+@st.cache_data
+def build_hist_df():
+    # Generate static history for visualization
+    rng = np.random.default_rng(42)
+    u = rng.random((2, 50), dtype=np.float32)
+    hist_prices = 100 + 400 * u[0]
+    hist_marketing = 5000 + 45000 * u[1]
+    noise = rng.standard_normal(50, dtype=np.float32) * 50
+    hist_demand = 2000 - 3.5 * hist_prices + 0.04 * hist_marketing + noise
+    
+    return pd.DataFrame({'Price': hist_prices, 'Marketing': hist_marketing, 'Attendance': hist_demand})
+
+@st.cache_resource
+def build_hist_figs(df_hist):
+    fig_p = px.scatter(df_hist, x='Price', y='Attendance', title="Price Sensitivity Analysis", height=400)
+    fig_m = px.scatter(df_hist, x='Marketing', y='Attendance', title="Marketing ROI Analysis", height=400)
+    return fig_p, fig_m
+
+@st.cache_resource
+def _excel_pool():
+    # One pool per server process; a module-level pool would be rebuilt on every rerun
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
 # --- SIDEBAR (INPUTS) ---
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/2910/2910793.png", width=100)
     st.title("Command Center")
     
-    team_name = st.text_input("Team Name", "Team Alpha")
-    
-    st.markdown("### 1. Operations")
-    venue = st.selectbox("Venue", list(VENUES.keys()), index=2)
-    catering = st.selectbox("Catering", list(CATERING.keys()), index=1)
-    staffing = st.selectbox("Service Level", list(STAFFING.keys()), index=1)
-    
-    st.markdown("### 2. Marketing & Price")
-    price = st.slider("Ticket Price ($)", 50, 500, 250, 10)
-    marketing = st.number_input("Marketing Budget ($)", 0, 100000, 20000, 1000)
-    
-    st.markdown("### 3. External Factors")
-    risk = st.selectbox("Risk Scenario", list(RISKS.keys()), index=0)
+    # Widgets inside a form only rerun the app on submit and keep their
+    # last submitted values in between
+    with st.form("controls"):
+        team_name = st.text_input("Team Name", "Team Alpha")
+        
+        st.markdown("### 1. Operations")
+        venue = st.selectbox("Venue", list(VENUES.keys()), index=2)
+        catering = st.selectbox("Catering", list(CATERING.keys()), index=1)
+        staffing = st.selectbox("Service Level", list(STAFFING.keys()), index=1)
+        
+        st.markdown("### 2. Marketing & Price")
+        price = st.slider("Ticket Price ($)", 50, 500, 250, 10)
+        marketing = st.number_input("Marketing Budget ($)", 0, 100000, 20000, 1000)
+        
+        st.markdown("### 3. External Factors")
+        risk = st.selectbox("Risk Scenario", list(RISKS.keys()), index=0)
+        
+        st.form_submit_button("Update Dashboard")
     
     inputs = {
         'Venue': venue, 'Catering': catering, 'Staffing': staffing,
@@ -172,7 +279,18 @@ st.title("🏆 Best Manager Simulation: The Grand Tech Summit")
 st.markdown("Welcome, **Event Manager**. Analyze, Plan, and Execute to win the title.")
 
 # Run Simulation Live
-results = run_simulation(inputs)
+# Reruns that don't touch the inputs reuse this session's last results
+results_key = tuple(inputs.values())
+if st.session_state.get('results_key') != results_key:
+    st.session_state.results = run_simulation(inputs)
+    st.session_state.results_key = results_key
+results = st.session_state.results
+
+# Start building the submission file in the background as soon as the inputs change
+xlsx_hash = hash((team_name, tuple(inputs.values()), results['Score']))
+if st.session_state.get('xlsx_hash') != xlsx_hash:
+    st.session_state.xlsx = _excel_pool().submit(generate_excel_download, inputs, results, team_name)
+    st.session_state.xlsx_hash = xlsx_hash
 
 # Tabs
 tab1, tab2, tab3 = st.tabs(["🚀 Live Dashboard", "📊 Market Analytics", "📜 Mission Briefing"])
@@ -191,52 +309,29 @@ with tab1:
     with c1:
         st.subheader("Financial Snapshot")
         # Waterfall or Bar chart
-        df_fin = pd.DataFrame({
-            'Category': ['Revenue', 'Venue', 'Marketing', 'Catering', 'Staffing', 'NET PROFIT'],
-            'Amount': [
-                results['Revenue'], 
-                -results['Details']['Venue Cost'], 
-                -results['Details']['Marketing Cost'], 
-                -results['Details']['Catering Cost'], 
-                -results['Details']['Staff Cost'], 
-                results['Profit']
-            ],
-            'Type': ['Income', 'Expense', 'Expense', 'Expense', 'Expense', 'Total']
-        })
-        fig_fin = go.Figure(go.Waterfall(
-            name = "Finance", orientation = "v",
-            measure = ["relative", "relative", "relative", "relative", "relative", "total"],
-            x = df_fin['Category'],
-            textposition = "outside",
-            text = df_fin['Amount']/1000,
-            y = df_fin['Amount'],
-            connector = {"line":{"color":"rgb(63, 63, 63)"}},
-        ))
-        st.plotly_chart(fig_fin, use_container_width=True)
+        details = results['Details']
+        fig_fin = make_waterfall(
+            results['Revenue'], details['Venue Cost'], details['Marketing Cost'],
+            details['Catering Cost'], details['Staff Cost'], results['Profit']
+        )
+        st.plotly_chart(fig_fin, use_container_width=False)
 
     with c2:
         st.subheader("Satisfaction Components")
         # Radar Chart or Gauge
-        fig_gauge = go.Figure(go.Indicator(
-            mode = "gauge+number",
-            value = results['Satisfaction'],
-            title = {'text': "Customer Satisfaction"},
-            gauge = {'axis': {'range': [None, 100]}, 'bar': {'color': "darkblue"}}
-        ))
-        st.plotly_chart(fig_gauge, use_container_width=True)
+        st.plotly_chart(make_gauge(results['Satisfaction']), use_container_width=False)
         
     # SUBMISSION AREA
     st.markdown("---")
     st.subheader("📤 Submit Your Strategy")
     st.info("Once you are confident in your strategy, click below to generate your submission file.")
     
-    excel_data = generate_excel_download(inputs, results, team_name)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M")
     file_name = f"{team_name}_Submission_{timestamp}.xlsx"
     
     st.download_button(
         label="📥 Download Submission File (.xlsx)",
-        data=excel_data,
+        data=st.session_state.xlsx.result(),
         file_name=file_name,
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -245,23 +340,21 @@ with tab2:
     st.header("Historical Market Data")
     st.markdown("Use this data to estimate the optimal **Price** and **Marketing Budget**.")
     
-    # Generate static history for visualization
-    np.random.seed(42)
-    hist_prices = np.random.uniform(100, 500, 50)
-    hist_marketing = np.random.uniform(5000, 50000, 50)
-    hist_demand = 2000 - 3.5 * hist_prices + 0.04 * hist_marketing + np.random.normal(0, 50, 50)
-    
-    df_hist = pd.DataFrame({'Price': hist_prices, 'Marketing': hist_marketing, 'Attendance': hist_demand})
+    df_hist = build_hist_df()
+    fig_p, fig_m = build_hist_figs(df_hist)
     
     col_a, col_b = st.columns(2)
     
     with col_a:
-        fig_p = px.scatter(df_hist, x='Price', y='Attendance', title="Price Sensitivity Analysis")
         st.plotly_chart(fig_p, use_container_width=True)
         
     with col_b:
-        fig_m = px.scatter(df_hist, x='Marketing', y='Attendance', title="Marketing ROI Analysis")
         st.plotly_chart(fig_m, use_container_width=True)
+    
+    st.subheader("Optimal Strategy Map")
+    st.markdown("Success Score for every **Price** / **Marketing Budget** pair, given your current venue, catering, staffing and risk choices.")
+    fig_map = make_strategy_map(inputs['Venue'], inputs['Catering'], inputs['Staffing'], inputs['Risk'])
+    st.plotly_chart(fig_map, use_container_width=True)
 
 with tab3:
     st.header("The Mission")